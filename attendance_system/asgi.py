@@ -19,10 +19,27 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "attendance_system.settings")
 django_asgi_app = get_asgi_application()
 
 from classes.routing import websocket_urlpatterns
+from classes.redis_utils import aredis_client
 from attendance_system.middleware import JWTAuthMiddleware
 
+
+async def lifespan_app(scope, receive, send):
+    """
+    Handle ASGI lifespan events; closes the shared Redis pool on shutdown.
+    """
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await aredis_client.aclose(close_connection_pool=True)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
+    "lifespan": lifespan_app,
     "websocket": JWTAuthMiddleware(
         AuthMiddlewareStack(URLRouter(websocket_urlpatterns))
     ),
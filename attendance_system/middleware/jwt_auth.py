@@ -1,12 +1,26 @@
-from urllib.parse import parse_qs
-from channels.db import database_sync_to_async
+from functools import lru_cache
 from channels.middleware import BaseMiddleware
 from django.contrib.auth.models import AnonymousUser
-from rest_framework_simplejwt.tokens import AccessToken
-from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from users.models import User
 
 
+@lru_cache(maxsize=None)
+def load_token_classes():
+    """
+    Import simplejwt (and the claims helper) on the first WebSocket handshake
+    that carries a token instead of at ASGI startup. HTTP requests load it
+    anyway through the REST authentication class.
+
+    Returns:
+        tuple: (AccessToken, get_claims_user, tuple of token validation exceptions)
+    """
+    from rest_framework_simplejwt.tokens import AccessToken
+    from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+    from users.authentication import get_claims_user
+
+    return AccessToken, get_claims_user, (InvalidToken, TokenError, KeyError)
+
+
 class JWTAuthMiddleware(BaseMiddleware):
     """
     Custom JWT authentication middleware for Django Channels WebSocket connections.
@@ -18,13 +32,18 @@ class JWTAuthMiddleware(BaseMiddleware):
         token = self.get_token_from_scope(scope)
 
         if token:
+            AccessToken, get_claims_user, token_errors = load_token_classes()
             try:
                 # Validate and decode the token
                 access_token = AccessToken(token)
-                user_id = access_token.get("user_id")
 
-                # Fetch user from database
-                user = await self.get_user(user_id)
+                # Build the user from the token claims or the database;
+                # inactive users connect as anonymous
+                user = get_claims_user(access_token)
+                if user is None:
+                    user = await self.get_user(access_token.get("user_id"))
+                if user and not user.is_active:
+                    user = None
 
                 if user:
                     # Add user, user_id, and role to scope
@@ -36,7 +55,7 @@ class JWTAuthMiddleware(BaseMiddleware):
                     scope["user_id"] = None
                     scope["role"] = None
 
-            except (InvalidToken, TokenError, KeyError):
+            except token_errors:
                 # Invalid token - set anonymous user
                 scope["user"] = AnonymousUser()
                 scope["user_id"] = None
@@ -53,35 +72,34 @@ class JWTAuthMiddleware(BaseMiddleware):
         """
         Extract JWT token from WebSocket connection.
         First checks query parameters, then falls back to headers.
+        The raw bytes are returned without building a dict or decoding,
+        since AccessToken accepts bytes.
 
         Example WebSocket connection with token in query:
         ws://localhost:8000/ws/?token=your_jwt_token
         """
         # Try to get token from query parameters
-        query_string = scope.get("query_string", b"").decode("utf-8")
-        query_params = parse_qs(query_string)
-
-        if "token" in query_params:
-            return query_params["token"][0]
+        for param in scope.get("query_string", b"").split(b"&"):
+            name, _, value = param.partition(b"=")
+            if name == b"token" and value:
+                return value
 
         # Try to get token from headers (if provided)
-        headers = dict(scope.get("headers", []))
-
-        # Check for Authorization header
-        if b"authorization" in headers:
-            auth_header = headers[b"authorization"].decode("utf-8")
-            # Expected format: "Bearer <token>"
-            if auth_header.startswith("Bearer "):
-                return auth_header.split(" ")[1]
+        for name, value in scope.get("headers", ()):
+            # Check for Authorization header
+            if name == b"authorization":
+                # Expected format: "Bearer <token>"
+                if value.startswith(b"Bearer "):
+                    return value[7:]
+                break
 
         return None
 
-    @database_sync_to_async
-    def get_user(self, user_id):
+    async def get_user(self, user_id):
         """
         Fetch user from database by ID.
         """
         try:
-            return User.objects.get(id=user_id)
+            return await User.objects.aget(id=user_id)
         except User.DoesNotExist:
             return None
@@ -79,15 +79,12 @@ WSGI_APPLICATION = "attendance_system.wsgi.application"
 # ASGI Application for WebSocket support
 ASGI_APPLICATION = "attendance_system.asgi.application"
 
-# Channel Layers (Redis)
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels_redis.core.RedisChannelLayer",
-        "CONFIG": {
-            "hosts": [("127.0.0.1", 6379)],
-        },
-    },
-}
+# No channel layer: class events are relayed over Redis pub/sub
+# (classes/pubsub.py), so consumers don't allocate layer channels
+
+# Send WebSocket events as binary frames (orjson bytes, no str round trip).
+# Clients must then decode the frame before JSON.parse.
+WEBSOCKET_BINARY_FRAMES = config("WEBSOCKET_BINARY_FRAMES", default=False, cast=bool)
 
 
 # Database
@@ -120,9 +117,21 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# https://docs.djangoproject.com/en/6.0/topics/auth/passwords/#using-argon2-with-django
+# Argon2 is much cheaper per login than PBKDF2 at its default iteration count;
+# existing PBKDF2 hashes still verify and are upgraded on the next login.
+PASSWORD_HASHERS = [
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.ClaimsJWTAuthentication",
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
@@ -150,6 +159,8 @@ SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "AUTH_HEADER_TYPES": ("Bearer",),
+    # Embed role/username/email/is_active in tokens (see users.tokens)
+    "TOKEN_OBTAIN_SERIALIZER": "users.serializers.token.UserClaimsTokenObtainPairSerializer",
 }
 
 # drf-spectacular settings
@@ -1,15 +1,33 @@
-import json
-from channels.generic.websocket import AsyncWebsocketConsumer
+import orjson
 from channels.db import database_sync_to_async
-from asgiref.sync import sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from django.db import connection, transaction
 from classes.redis_utils import (
+    CLASS_CHANNEL_PREFIX,
     get_active_session,
-    update_attendance as redis_update_attendance,
+    get_attendance_summary,
+    get_class_channel,
+    get_member_channel,
+    get_student_status,
+    publish_class_event,
+    update_attendance_atomic,
     clear_active_session,
-    session_exists,
 )
 from classes.models import Class, Attendance
-from users.models import User
+from classes.pubsub import attendance_mark_batcher, class_event_relay
+
+
+_loads = orjson.loads
+
+# Frames whose shape never changes are serialized once per process
+_CONNECTED = (
+    b'{"event":"CONNECTED","data":{"message":"WebSocket connection established",'
+    b'"userId":%b,"role":%b}}'
+)
+_NOT_YET_UPDATED = orjson.dumps(
+    {"event": "MY_ATTENDANCE", "data": {"status": "not yet updated"}}
+)
 
 
 class AttendanceConsumer(AsyncWebsocketConsumer):
@@ -19,6 +37,31 @@ class AttendanceConsumer(AsyncWebsocketConsumer):
     Uses Redis for session storage.
     """
 
+    # Event name -> handler method name
+    _HANDLERS = {
+        "ATTENDANCE_MARKED": "handle_attendance_marked",
+        "TODAY_SUMMARY": "handle_today_summary",
+        "MY_ATTENDANCE": "handle_my_attendance",
+        "DONE": "handle_done",
+    }
+
+    # Events each role may send, resolved once per connection
+    _ROLE_EVENTS = {
+        "TEACHER": frozenset({"ATTENDANCE_MARKED", "TODAY_SUMMARY", "DONE"}),
+        "STUDENT": frozenset({"MY_ATTENDANCE"}),
+    }
+
+    # Send binary frames instead of text frames
+    _use_bytes = settings.WEBSOCKET_BINARY_FRAMES
+
+    # Error sent when a role is not allowed to send an event
+    _FORBIDDEN_MESSAGES = {
+        "ATTENDANCE_MARKED": "Only teachers can mark attendance",
+        "TODAY_SUMMARY": "Only teachers can request attendance summary",
+        "MY_ATTENDANCE": "Only students can request their own attendance",
+        "DONE": "Only teachers can end attendance session",
+    }
+
     async def connect(self):
         """
         Handle WebSocket connection.
@@ -30,62 +73,101 @@ class AttendanceConsumer(AsyncWebsocketConsumer):
         self.role = self.scope.get("role")
         self.user = self.scope.get("user")
 
-        # Check if user is authenticated
+        # Reject unauthenticated handshakes before accepting them
         if not self.user_id or self.user.is_anonymous:
-            await self.accept()
-            await self.send_error(
-                "Authentication required. Please provide a valid JWT token."
-            )
-            await self.close()
+            await self.close(code=4401)
             return
 
-        # Join attendance group for broadcasting
-        await self.channel_layer.group_add("attendance", self.channel_name)
+        self._allowed = self._ROLE_EVENTS.get(self.role, frozenset())
+
+        # Follow live events of the user's classes
+        await self.follow_classes()
 
         # Accept connection
         await self.accept()
 
         # Send connection success message with user info
-        await self.send(
-            text_data=json.dumps({
-                "event": "CONNECTED",
-                "data": {
-                    "message": "WebSocket connection established",
-                    "userId": self.user_id,
-                    "role": self.role,
-                },
-            })
+        await self.send_frame(
+            _CONNECTED % (orjson.dumps(self.user_id), orjson.dumps(self.role))
         )
 
     async def disconnect(self, close_code):
         """
         Handle WebSocket disconnection.
         """
-        # Leave attendance group
-        await self.channel_layer.group_discard("attendance", self.channel_name)
+        # Stop following class events and membership notices
+        await class_event_relay.unsubscribe(self.class_event)
+        await class_event_relay.unsubscribe(self.class_joined)
+
+    async def follow_classes(self):
+        """
+        Subscribe to the events of the classes this user belongs to.
+        Teachers follow the classes they teach, students the classes they're
+        enrolled in, and admins follow every class. Classes joined later are
+        followed when their membership notice arrives.
+        """
+        if self.role == "ADMIN":
+            await class_event_relay.subscribe(
+                [f"{CLASS_CHANNEL_PREFIX}*"], self.class_event, pattern=True
+            )
+            return
+
+        await class_event_relay.subscribe(
+            [get_member_channel(self.user_id)], self.class_joined
+        )
+
+        channels = [
+            get_class_channel(class_id)
+            async for class_id in Class.objects.for_user(self.user).values_list(
+                "id", flat=True
+            )
+        ]
+        if channels:
+            await class_event_relay.subscribe(channels, self.class_event)
+
+    async def follow_class(self, class_id):
+        """
+        Follow a class's events so the sender sees its own broadcasts.
+        """
+        await class_event_relay.subscribe(
+            [get_class_channel(class_id)], self.class_event
+        )
+
+    async def class_joined(self, class_id):
+        """
+        Follow a class the user joined while connected (see
+        publish_class_joined).
+        """
+        await self.follow_class(class_id)
+
+    async def broadcast(self, class_id, event, data):
+        """
+        Publish an event to everyone following the class.
+        Pending attendance marks of the class are flushed first to keep order.
+        """
+        await self.follow_class(class_id)
+        await attendance_mark_batcher.flush(class_id)
+        await publish_class_event(
+            class_id, orjson.dumps({"event": event, "data": data})
+        )
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """
-        Handle incoming WebSocket messages.
+        Handle incoming WebSocket messages (text or binary frames).
         Route to appropriate handlers based on event type.
         """
         try:
-            data = json.loads(text_data)
+            data = _loads(text_data if text_data is not None else bytes_data)
             event = data.get("event")
-            payload = data.get("data", {})
-
-            if event == "ATTENDANCE_MARKED":
-                await self.handle_attendance_marked(payload)
-            elif event == "TODAY_SUMMARY":
-                await self.handle_today_summary(payload)
-            elif event == "MY_ATTENDANCE":
-                await self.handle_my_attendance(payload)
-            elif event == "DONE":
-                await self.handle_done(payload)
+
+            if event in self._allowed:
+                await getattr(self, self._HANDLERS[event])(data.get("data") or {})
+            elif event in self._FORBIDDEN_MESSAGES:
+                await self.send_error(self._FORBIDDEN_MESSAGES[event])
             else:
                 await self.send_error(f"Unknown event: {event}")
 
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             await self.send_error("Invalid JSON format")
         except Exception as e:
             await self.send_error(str(e))
@@ -95,11 +177,6 @@ class AttendanceConsumer(AsyncWebsocketConsumer):
         Handle ATTENDANCE_MARKED event.
         Teacher marks a student's attendance.
         """
-        # Verify teacher role
-        if self.role != "TEACHER":
-            await self.send_error("Only teachers can mark attendance")
-            return
-
         class_id = payload.get("classId")
         student_id = payload.get("studentId")
         attendance_status = payload.get("status")
@@ -108,68 +185,43 @@ class AttendanceConsumer(AsyncWebsocketConsumer):
             await self.send_error("Missing classId, studentId or status")
             return
 
-        # Check if active session exists for this class
-        if not await sync_to_async(session_exists)(class_id):
+        # Update session in Redis (fails if no active session for this class)
+        if not await update_attendance_atomic(
+            class_id, str(student_id), attendance_status
+        ):
             await self.send_error("No active attendance session for this class")
             return
 
-        # Update session in Redis
-        await sync_to_async(redis_update_attendance)(
-            class_id, student_id, attendance_status
-        )
-
-        # Broadcast to all connected clients via channel layer
-        await self.channel_layer.group_send(
-            "attendance",
-            {
-                "type": "attendance_broadcast",
-                "event": "ATTENDANCE_MARKED",
-                "data": {
-                    "classId": class_id,
-                    "studentId": student_id,
-                    "status": attendance_status,
-                },
-            },
-        )
+        # Broadcast to everyone following the class, batched with other
+        # marks sent within the same short window
+        await self.follow_class(class_id)
+        attendance_mark_batcher.add(class_id, student_id, attendance_status)
 
     async def handle_today_summary(self, payload):
         """
         Handle TODAY_SUMMARY event.
         Calculate and broadcast attendance summary.
         """
-        # Verify teacher role
-        if self.role != "TEACHER":
-            await self.send_error("Only teachers can request attendance summary")
-            return
-
         class_id = payload.get("classId")
 
         if not class_id:
             await self.send_error("Class ID required")
             return
 
-        session = await sync_to_async(get_active_session)(class_id)
-        if not session:
+        summary = await get_attendance_summary(class_id)
+        if not summary:
             await self.send_error("No active attendance session for this class")
             return
 
-        attendance = session.get("attendance", {})
-        present = sum(1 for status in attendance.values() if status == "present")
-        absent = sum(1 for status in attendance.values() if status == "absent")
-        total = len(attendance)
-
-        # Broadcast to all connected clients
-        await self.channel_layer.group_send(
-            "attendance",
+        # Broadcast to everyone following the class
+        await self.broadcast(
+            class_id,
+            "TODAY_SUMMARY",
             {
-                "type": "attendance_broadcast",
-                "event": "TODAY_SUMMARY",
-                "data": {
-                    "classId": class_id,
-                    "present": present,
-                    "absent": absent,
-                    "total": total,
-                },
+                "classId": class_id,
+                "present": summary["present"],
+                "absent": summary["absent"],
+                "total": summary["total"],
             },
         )
 
@@ -178,11 +230,6 @@ class AttendanceConsumer(AsyncWebsocketConsumer):
         Handle MY_ATTENDANCE event.
         Student requests their own attendance status.
         """
-        # Verify student role
-        if self.role != "STUDENT":
-            await self.send_error("Only students can request their own attendance")
-            return
-
         class_id = payload.get("classId")
         student_id = str(self.user_id)  # Get from JWT (scope)
 
@@ -190,44 +237,26 @@ class AttendanceConsumer(AsyncWebsocketConsumer):
             await self.send_error("Class ID required")
             return
 
-        session = await sync_to_async(get_active_session)(class_id)
-        if not session:
-            await self.send(
-                text_data=json.dumps({
-                    "event": "MY_ATTENDANCE",
-                    "data": {"status": "not yet updated"},
-                })
-            )
+        # No active session means no attendance hash, so this covers both cases
+        student_status = await get_student_status(class_id, student_id)
+        if student_status is None:
+            await self.send_frame(_NOT_YET_UPDATED)
             return
 
-        student_status = session.get("attendance", {}).get(
-            student_id, "not yet updated"
-        )
-
-        await self.send(
-            text_data=json.dumps({
-                "event": "MY_ATTENDANCE",
-                "data": {"status": student_status},
-            })
-        )
+        await self.send_event("MY_ATTENDANCE", {"status": student_status})
 
     async def handle_done(self, payload):
         """
         Handle DONE event.
         Persist attendance to database and clear session.
         """
-        # Verify teacher role
-        if self.role != "TEACHER":
-            await self.send_error("Only teachers can end attendance session")
-            return
-
         class_id = payload.get("classId")
 
         if not class_id:
             await self.send_error("Class ID required")
             return
 
-        session = await sync_to_async(get_active_session)(class_id)
+        session = await get_active_session(class_id)
         if not session:
             await self.send_error("No active attendance session for this class")
             return
@@ -240,26 +269,22 @@ class AttendanceConsumer(AsyncWebsocketConsumer):
             return
 
         # Clear session from Redis
-        await sync_to_async(clear_active_session)(class_id)
+        await clear_active_session(class_id)
 
-        # Broadcast to all connected clients
-        await self.channel_layer.group_send(
-            "attendance",
+        # Broadcast to everyone following the class
+        await self.broadcast(
+            class_id,
+            "DONE",
             {
-                "type": "attendance_broadcast",
-                "event": "DONE",
-                "data": {
-                    "classId": class_id,
-                    "message": "Attendance persisted",
-                    "present": summary["present"],
-                    "absent": summary["absent"],
-                    "total": summary["total"],
-                },
+                "classId": class_id,
+                "message": "Attendance persisted",
+                "present": summary["present"],
+                "absent": summary["absent"],
+                "total": summary["total"],
             },
         )
 
-    @database_sync_to_async
-    def persist_attendance(self, session):
+    async def persist_attendance(self, session):
         """
         Persist attendance records to database.
         """
@@ -268,51 +293,96 @@ class AttendanceConsumer(AsyncWebsocketConsumer):
         attendance_dict = session.get("attendance", {})
 
         try:
-            class_instance = Class.objects.get(id=class_id)
-
-            # Get all enrolled students
-            enrolled_students = class_instance.students.all()
-
-            # Mark all unmarked students as absent
-            for student in enrolled_students:
-                student_id_str = str(student.id)
-                if student_id_str not in attendance_dict:
-                    attendance_dict[student_id_str] = "absent"
-
-            # Create attendance records
-            for student_id_str, status in attendance_dict.items():
-                try:
-                    student = User.objects.get(id=student_id_str)
-                    Attendance.objects.create(
+            class_instance = await Class.objects.only("id").aget(id=class_id)
+        except Class.DoesNotExist:
+            return None
+
+        # Get all enrolled student ids in one query
+        student_ids = [
+            student_id
+            async for student_id in class_instance.students.values_list(
+                "id", flat=True
+            )
+        ]
+
+        # One row per enrolled student; unmarked students are absent
+        statuses = {
+            student_id: attendance_dict.get(str(student_id), "absent")
+            for student_id in student_ids
+        }
+        await self.insert_attendance_rows(session_id, class_instance.id, statuses)
+
+        # Calculate summary
+        present = absent = 0
+        for attendance_status in statuses.values():
+            if attendance_status == "present":
+                present += 1
+            elif attendance_status == "absent":
+                absent += 1
+
+        return {"present": present, "absent": absent, "total": len(statuses)}
+
+    @database_sync_to_async
+    def insert_attendance_rows(self, session_id, class_id, statuses):
+        """
+        Insert one attendance row per student (student_id -> status), skipping
+        students that already have a row for the session, so a repeated DONE
+        is harmless. Backends with ignore-conflict support (SQLite, Postgres)
+        rely on the (session_id, student) unique constraint; others (the MSSQL
+        backend) skip the existing rows looked up in the same transaction,
+        which a concurrent DONE can still race with.
+        """
+        ignore_conflicts = connection.features.supports_ignore_conflicts
+        with transaction.atomic():
+            existing = set()
+            if not ignore_conflicts:
+                existing.update(
+                    Attendance.objects.filter(
+                        session_id=session_id, student_id__in=statuses
+                    ).values_list("student_id", flat=True)
+                )
+            Attendance.objects.bulk_create(
+                [
+                    Attendance(
                         session_id=session_id,
-                        class_instance=class_instance,
-                        student=student,
-                        status=status,
+                        class_instance_id=class_id,
+                        student_id=student_id,
+                        status=attendance_status,
                     )
-                except User.DoesNotExist:
-                    continue
+                    for student_id, attendance_status in statuses.items()
+                    if student_id not in existing
+                ],
+                batch_size=500,
+                ignore_conflicts=ignore_conflicts,
+            )
 
-            # Calculate summary
-            present = sum(1 for s in attendance_dict.values() if s == "present")
-            absent = sum(1 for s in attendance_dict.values() if s == "absent")
-            total = len(attendance_dict)
+    async def class_event(self, text):
+        """
+        Forward a class event relayed from Redis pub/sub to the client.
+        The payload is already serialized by the sender.
+        """
+        if self._use_bytes:
+            await self.send(bytes_data=text.encode())
+        else:
+            await self.send(text_data=text)
 
-            return {"present": present, "absent": absent, "total": total}
-        except Class.DoesNotExist:
-            return None
+    async def send_event(self, event, data):
+        """
+        Serialize an event once with orjson and send it to the client.
+        """
+        await self.send_frame(orjson.dumps({"event": event, "data": data}))
 
-    async def attendance_broadcast(self, event):
+    async def send_frame(self, payload):
         """
-        Handler for broadcasting messages to all clients in the group.
+        Send an already serialized event as a binary or text frame.
         """
-        await self.send(
-            text_data=json.dumps({"event": event["event"], "data": event["data"]})
-        )
+        if self._use_bytes:
+            await self.send(bytes_data=payload)
+        else:
+            await self.send(text_data=payload.decode())
 
     async def send_error(self, message):
         """
         Send error message to client.
         """
-        await self.send(
-            text_data=json.dumps({"event": "ERROR", "data": {"message": message}})
-        )
+        await self.send_event("ERROR", {"message": message})
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-15 08:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0003_alter_attendance_unique_together_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['class_instance', 'session_id', 'status'], name='att_cls_sess_stat'),
+        ),
+    ]
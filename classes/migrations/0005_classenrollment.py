@@ -0,0 +1,43 @@
+# Generated by Django 6.0.1 on 2026-10-15 08:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0004_attendance_att_cls_sess_stat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # The table already exists as the auto-created M2M table; only the
+        # model state changes.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ClassEnrollment',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('class_instance', models.ForeignKey(db_column='class_id', on_delete=django.db.models.deletion.CASCADE, to='classes.class')),
+                        ('student', models.ForeignKey(db_column='user_id', on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'classes_class_students',
+                        'unique_together': {('class_instance', 'student')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='class',
+                    name='students',
+                    field=models.ManyToManyField(blank=True, limit_choices_to={'role': 'student'}, related_name='classes_enrolled', through='classes.ClassEnrollment', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='classenrollment',
+            index=models.Index(fields=['student', 'class_instance'], name='enroll_student_class'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-15 09:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0005_classenrollment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['class_instance', 'student', '-created_at'], name='att_cls_student_created'),
+        ),
+    ]
@@ -1,6 +1,57 @@
 from django.db import models
 from users.models import User
 
+# User columns rendered by UserReadSerializer
+MEMBER_FIELDS = ("id", "username", "email", "role")
+
+
+def students_prefetch():
+    """
+    Prefetch of a class's students limited to MEMBER_FIELDS.
+    """
+    return models.Prefetch("students", queryset=User.objects.only(*MEMBER_FIELDS))
+
+
+class ClassQuerySet(models.QuerySet):
+    def for_user(self, user):
+        """
+        Classes visible to a user: teachers get the classes they teach,
+        students the classes they're enrolled in, admins every class.
+        """
+        if user.role == User.Role.TEACHER:
+            return self.filter(teacher_id=user.id)
+        if user.role == User.Role.STUDENT:
+            return self.filter(students=user.id)
+        if user.role == User.Role.ADMIN:
+            return self.all()
+        return self.none()
+
+    def with_enrollment(self, user):
+        """
+        Annotate `is_enrolled`: whether the user is enrolled in the class,
+        as an EXISTS subquery of the main query.
+        """
+        return self.annotate(
+            is_enrolled=models.Exists(
+                ClassEnrollment.objects.filter(
+                    class_instance=models.OuterRef("pk"), student_id=user.id
+                )
+            )
+        )
+
+    def with_teacher(self):
+        """
+        Join the teacher, selecting only the class columns and the teacher
+        columns UserReadSerializer renders.
+        """
+        return self.select_related("teacher").only(
+            "id",
+            "class_name",
+            "created_at",
+            "updated_at",
+            *(f"teacher__{field}" for field in MEMBER_FIELDS),
+        )
+
 
 class Class(models.Model):
     """
@@ -16,6 +67,7 @@ class Class(models.Model):
     )
     students = models.ManyToManyField(
         User,
+        through="ClassEnrollment",
         related_name="classes_enrolled",
         limit_choices_to={"role": "student"},
         blank=True,
@@ -23,6 +75,8 @@ class Class(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ClassQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Class"
         verbose_name_plural = "Classes"
@@ -32,6 +86,30 @@ class Class(models.Model):
         return f"{self.class_name} (Teacher: {self.teacher.username})"
 
 
+class ClassEnrollment(models.Model):
+    """
+    Enrollment of a student in a class (the `Class.students` M2M table).
+    """
+
+    class_instance = models.ForeignKey(
+        Class, on_delete=models.CASCADE, db_column="class_id"
+    )
+    student = models.ForeignKey(User, on_delete=models.CASCADE, db_column="user_id")
+
+    class Meta:
+        db_table = "classes_class_students"
+        unique_together = [["class_instance", "student"]]
+        indexes = [
+            # Student -> classes lookups (student class lists, membership checks)
+            models.Index(
+                fields=["student", "class_instance"], name="enroll_student_class"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} in {self.class_instance_id}"
+
+
 class Attendance(models.Model):
     """
     Represents attendance records for students in classes.
@@ -58,6 +136,18 @@ class Attendance(models.Model):
         verbose_name = "Attendance"
         verbose_name_plural = "Attendance Records"
         unique_together = [["session_id", "student"]]
+        indexes = [
+            # Covers the per-session present/absent counts of a class
+            models.Index(
+                fields=["class_instance", "session_id", "status"],
+                name="att_cls_sess_stat",
+            ),
+            # Latest record of a student in a class (my_attendance)
+            models.Index(
+                fields=["class_instance", "student", "-created_at"],
+                name="att_cls_student_created",
+            ),
+        ]
         ordering = ["-created_at"]
 
     def __str__(self):
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import orjson
+from collections import defaultdict, deque
+from classes.redis_utils import aredis_client, publish_class_event
+
+logger = logging.getLogger(__name__)
+
+
+class ClassEventRelay:
+    """
+    Relays Redis pub/sub messages for class channels to local WebSocket consumers.
+    A single subscriber connection is shared by every consumer in the process;
+    Redis fans each published event out, and the relay hands the already
+    serialized payload to the consumers listening on that channel.
+    """
+
+    def __init__(self, retry_delay=1.0):
+        # Channel (or pattern) -> callbacks of local consumers listening on it
+        self.listeners = defaultdict(set)
+        # Listened keys that are glob patterns rather than channels
+        self.patterns = set()
+        self.pubsub = None
+        self.task = None
+        self.lock = asyncio.Lock()
+        # Seconds to wait before resubscribing after a lost connection
+        self.retry_delay = retry_delay
+
+    async def subscribe(self, channels, callback, pattern=False):
+        """
+        Register a callback for the given channels (or glob patterns).
+        The callback receives the raw message data.
+        """
+        async with self.lock:
+            new_channels = [
+                channel for channel in channels if channel not in self.listeners
+            ]
+            for channel in channels:
+                self.listeners[channel].add(callback)
+
+            if new_channels:
+                if self.pubsub is None:
+                    self.pubsub = aredis_client.pubsub(ignore_subscribe_messages=True)
+                if pattern:
+                    self.patterns.update(new_channels)
+                    await self.pubsub.psubscribe(*new_channels)
+                else:
+                    await self.pubsub.subscribe(*new_channels)
+
+            # Also restarts a listener that stopped, even if every channel
+            # was already subscribed
+            if self.pubsub is not None and (self.task is None or self.task.done()):
+                self.task = asyncio.create_task(self.listen())
+
+    async def unsubscribe(self, callback):
+        """
+        Remove a callback from every channel; drop channels nobody listens on.
+        """
+        async with self.lock:
+            channels, patterns = [], []
+            for channel in list(self.listeners):
+                callbacks = self.listeners[channel]
+                callbacks.discard(callback)
+                if not callbacks:
+                    del self.listeners[channel]
+                    if channel in self.patterns:
+                        self.patterns.discard(channel)
+                        patterns.append(channel)
+                    else:
+                        channels.append(channel)
+
+            if channels:
+                await self.pubsub.unsubscribe(*channels)
+            if patterns:
+                await self.pubsub.punsubscribe(*patterns)
+
+    async def listen(self):
+        """
+        Relay messages until nothing is subscribed any more.
+        A failing subscriber connection is logged and replaced, so the
+        consumers of this process keep receiving events.
+        """
+        reconnect = False
+        while True:
+            try:
+                if reconnect:
+                    await self.resubscribe()
+                await self.relay_messages()
+                return
+            except Exception:
+                logger.exception(
+                    "Class event relay lost its Redis connection, resubscribing"
+                )
+                reconnect = True
+                await asyncio.sleep(self.retry_delay)
+
+    async def resubscribe(self):
+        """
+        Replace the pub/sub connection and subscribe it to every channel and
+        pattern that still has listeners.
+        """
+        async with self.lock:
+            try:
+                await self.pubsub.aclose()
+            except Exception:
+                # The old connection is already broken
+                pass
+
+            self.pubsub = aredis_client.pubsub(ignore_subscribe_messages=True)
+            channels = [key for key in self.listeners if key not in self.patterns]
+            patterns = [key for key in self.listeners if key in self.patterns]
+            if channels:
+                await self.pubsub.subscribe(*channels)
+            if patterns:
+                await self.pubsub.psubscribe(*patterns)
+
+    async def relay_messages(self):
+        """
+        Read messages from Redis and pass them to the registered callbacks.
+        """
+        async for message in self.pubsub.listen():
+            if message["type"] not in ("message", "pmessage"):
+                continue
+            channel = message["pattern"] or message["channel"]
+            for callback in tuple(self.listeners.get(channel, ())):
+                try:
+                    await callback(message["data"])
+                except Exception:
+                    # One broken socket must not stop delivery to the others
+                    logger.exception("Failed to relay event on %s", channel)
+
+
+class AttendanceMarkBatcher:
+    """
+    Coalesces ATTENDANCE_MARKED broadcasts of a class into one
+    ATTENDANCE_BATCH event per short window.
+    Marks are already stored in Redis when queued; only the fan-out is delayed.
+    A window holding a single mark is still sent as ATTENDANCE_MARKED.
+    """
+
+    def __init__(self, delay=0.08):
+        self.delay = delay
+        # Class ID -> marks waiting to be broadcast
+        self.pending = defaultdict(deque)
+        # Strong references to scheduled flushes
+        self.tasks = set()
+
+    def add(self, class_id, student_id, status):
+        """
+        Queue a mark; the first mark of a window schedules the flush.
+        """
+        marks = self.pending[class_id]
+        marks.append({"studentId": student_id, "status": status})
+        if len(marks) == 1:
+            task = asyncio.create_task(self.flush_later(class_id))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def flush_later(self, class_id):
+        """
+        Flush the class's marks once the window closes.
+        """
+        await asyncio.sleep(self.delay)
+        try:
+            await self.flush(class_id)
+        except Exception:
+            logger.exception("Failed to broadcast attendance marks of %s", class_id)
+
+    async def flush(self, class_id):
+        """
+        Broadcast the pending marks of a class right away.
+        Called before other class events so clients see marks first.
+        """
+        marks = self.pending.pop(class_id, None)
+        if not marks:
+            return
+
+        if len(marks) == 1:
+            message = {
+                "event": "ATTENDANCE_MARKED",
+                "data": {"classId": class_id, **marks[0]},
+            }
+        else:
+            message = {
+                "event": "ATTENDANCE_BATCH",
+                "data": {"classId": class_id, "marks": list(marks)},
+            }
+        await publish_class_event(class_id, orjson.dumps(message))
+
+
+# Shared by all consumers of this process
+class_event_relay = ClassEventRelay()
+attendance_mark_batcher = AttendanceMarkBatcher()
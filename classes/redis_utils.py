@@ -1,17 +1,87 @@
 import redis
-import json
+import redis.asyncio
+from collections import Counter
+from decouple import config
+
+# Sync helpers are used by the DRF views, async helpers by the WebSocket
+# consumer. Both clients draw from a bounded, blocking connection pool.
+REDIS_CONNECTION_KWARGS = {
+    "host": "127.0.0.1",
+    "port": 6379,
+    "db": 0,
+    "decode_responses": True,  # Automatically decode responses to strings
+    "max_connections": config("REDIS_POOL", default=50, cast=int),
+}
 
 # Redis client for session management
 redis_client = redis.Redis(
-    host="127.0.0.1",
-    port=6379,
-    db=0,
-    decode_responses=True,  # Automatically decode responses to strings
+    connection_pool=redis.BlockingConnectionPool(**REDIS_CONNECTION_KWARGS)
+)
+
+# Async Redis client for the WebSocket consumer (runs on the event loop)
+aredis_client = redis.asyncio.Redis(
+    connection_pool=redis.asyncio.BlockingConnectionPool(**REDIS_CONNECTION_KWARGS)
 )
 
 # Session key prefix
+#
+# Keys of the active session of a class <cid>:
+#   attendance:session:<cid>                hash: sessionId, classId, startedAt
+#   attendance:session:<cid>:att            hash: student_id -> status
+#   attendance:session:<cid>:present_count  counters kept in step with :att
+#   attendance:session:<cid>:absent_count
+# Marking a student writes one hash field; nothing is serialized as a blob.
 SESSION_KEY_PREFIX = "attendance:session:"
 
+# Suffix of the hash mapping student_id -> status for a session
+ATTENDANCE_KEY_SUFFIX = ":att"
+
+# Suffixes of the present/absent counters kept alongside the attendance hash
+PRESENT_COUNT_KEY_SUFFIX = ":present_count"
+ABSENT_COUNT_KEY_SUFFIX = ":absent_count"
+
+# Pub/sub channel prefix for per-class live events
+CLASS_CHANNEL_PREFIX = "attendance."
+
+# Pub/sub channel prefix for per-user membership notices; the payload is the
+# ID of a class the user just joined. Deliberately outside "attendance.*".
+MEMBER_CHANNEL_PREFIX = "member."
+
+# Marks a student only if the session exists and keeps the counters in step.
+# KEYS = meta, att, present_count, absent_count; ARGV = student_id, status
+UPDATE_ATTENDANCE_SCRIPT = """
+if redis.call("EXISTS", KEYS[1]) == 0 then
+    return 0
+end
+local previous = redis.call("HGET", KEYS[2], ARGV[1])
+redis.call("HSET", KEYS[2], ARGV[1], ARGV[2])
+if previous ~= ARGV[2] then
+    if previous == "present" then
+        redis.call("DECR", KEYS[3])
+    elseif previous == "absent" then
+        redis.call("DECR", KEYS[4])
+    end
+    if ARGV[2] == "present" then
+        redis.call("INCR", KEYS[3])
+    elseif ARGV[2] == "absent" then
+        redis.call("INCR", KEYS[4])
+    end
+end
+return 1
+"""
+_update_attendance_script = aredis_client.register_script(UPDATE_ATTENDANCE_SCRIPT)
+
+# Creates the session metadata hash only if no session exists yet.
+# KEYS = meta; ARGV = field, value, field, value, ...
+START_SESSION_SCRIPT = """
+if redis.call("EXISTS", KEYS[1]) == 1 then
+    return 0
+end
+redis.call("HSET", KEYS[1], unpack(ARGV))
+return 1
+"""
+_start_session_script = redis_client.register_script(START_SESSION_SCRIPT)
+
 
 def get_session_key(class_id):
     """
@@ -26,19 +96,129 @@ def get_session_key(class_id):
     return f"{SESSION_KEY_PREFIX}{class_id}"
 
 
-def set_active_session(class_id, session_data):
+def get_attendance_key(class_id):
+    """
+    Generate Redis key for the attendance hash of a class session.
+
+    Args:
+        class_id (str): Class ID
+
+    Returns:
+        str: Redis key for the hash mapping student_id to status
+    """
+    return f"{SESSION_KEY_PREFIX}{class_id}{ATTENDANCE_KEY_SUFFIX}"
+
+
+def get_count_keys(class_id):
+    """
+    Generate Redis keys for the present/absent counters of a class session.
+
+    Args:
+        class_id (str): Class ID
+
+    Returns:
+        tuple: (present counter key, absent counter key)
+    """
+    session_key = get_session_key(class_id)
+    return (
+        f"{session_key}{PRESENT_COUNT_KEY_SUFFIX}",
+        f"{session_key}{ABSENT_COUNT_KEY_SUFFIX}",
+    )
+
+
+def get_class_channel(class_id):
+    """
+    Generate the pub/sub channel for live events of a specific class.
+
+    Args:
+        class_id (str): Class ID
+
+    Returns:
+        str: Redis pub/sub channel name
+    """
+    return f"{CLASS_CHANNEL_PREFIX}{class_id}"
+
+
+def get_member_channel(user_id):
+    """
+    Generate the pub/sub channel for membership notices of a specific user.
+
+    Args:
+        user_id (str): User ID
+
+    Returns:
+        str: Redis pub/sub channel name
+    """
+    return f"{MEMBER_CHANNEL_PREFIX}{user_id}"
+
+
+async def publish_class_event(class_id, message):
+    """
+    Publish an already serialized event to everyone following a class.
+
+    Args:
+        class_id (str): Class ID
+        message (str | bytes): Serialized event
+    """
+    await aredis_client.publish(get_class_channel(class_id), message)
+
+
+def publish_class_joined(user_id, class_id):
+    """
+    Tell the user's open WebSocket connections to follow a class they just
+    joined (enrolled in or created).
+
+    Args:
+        user_id (str): User ID
+        class_id (str): Class ID
+    """
+    redis_client.publish(get_member_channel(user_id), str(class_id))
+
+
+def set_active_session(class_id, session_data, nx=False):
     """
     Store active session in Redis for a specific class.
 
+    Session metadata is stored as a hash; attendance lives in a sibling hash
+    so that marking a student never rewrites the whole session.
+
     Args:
         class_id (str): Class ID
         session_data (dict): Session data containing sessionId, classId, startedAt, attendance
+        nx (bool): Only create the session if none exists; the check and
+            the write happen atomically in one round trip
+
+    Returns:
+        bool: False if nx is set and the class already has an active session
     """
-    key = get_session_key(class_id)
-    redis_client.set(key, json.dumps(session_data))
+    meta = {
+        "sessionId": session_data["sessionId"],
+        "classId": session_data["classId"],
+        "startedAt": session_data["startedAt"],
+    }
+    attendance = session_data.get("attendance")
+
+    pipe = redis_client.pipeline()
+    if nx:
+        created = _start_session_script(
+            keys=[get_session_key(class_id)],
+            args=[item for field in meta.items() for item in field],
+        )
+        if not created:
+            return False
+    else:
+        pipe.hset(get_session_key(class_id), mapping=meta)
+    if attendance:
+        pipe.hset(get_attendance_key(class_id), mapping=attendance)
+        counts = Counter(attendance.values())
+        present_key, absent_key = get_count_keys(class_id)
+        pipe.set(present_key, counts["present"])
+        pipe.set(absent_key, counts["absent"])
+    pipe.execute()
+    return True
 
 
-def get_active_session(class_id):
+async def get_active_session(class_id):
     """
     Retrieve active session from Redis for a specific class.
 
@@ -48,16 +228,22 @@ def get_active_session(class_id):
     Returns:
         dict: Session data or None if no active session
     """
-    key = get_session_key(class_id)
-    data = redis_client.get(key)
-    if data:
-        return json.loads(data)
+    async with aredis_client.pipeline() as pipe:
+        pipe.hgetall(get_session_key(class_id))
+        pipe.hgetall(get_attendance_key(class_id))
+        meta, attendance = await pipe.execute()
+    if meta:
+        meta["attendance"] = attendance
+        return meta
     return None
 
 
-def update_attendance(class_id, student_id, status):
+async def update_attendance_atomic(class_id, student_id, status):
     """
-    Update attendance status for a student in the active session.
+    Update attendance status for a student if the session is active.
+
+    Existence check, write and counter update run in a single Lua script,
+    i.e. one round trip.
 
     Args:
         class_id (str): Class ID
@@ -65,27 +251,69 @@ def update_attendance(class_id, student_id, status):
         status (str): Attendance status ('present' or 'absent')
 
     Returns:
-        dict: Updated session data or None if no active session
-    """
-    session = get_active_session(class_id)
-    if session:
-        if "attendance" not in session:
-            session["attendance"] = {}
-        session["attendance"][student_id] = status
-        set_active_session(class_id, session)
-        return session
-    return None
+        bool: True if updated, False if there is no active session
+    """
+    updated = await _update_attendance_script(
+        keys=[
+            get_session_key(class_id),
+            get_attendance_key(class_id),
+            *get_count_keys(class_id),
+        ],
+        args=[student_id, status],
+    )
+    return bool(updated)
 
 
-def clear_active_session(class_id):
+async def get_student_status(class_id, student_id):
+    """
+    Get a single student's status in the active session.
+
+    Args:
+        class_id (str): Class ID
+        student_id (str): Student ID
+
+    Returns:
+        str: Attendance status or None if not marked / no active session
+    """
+    return await aredis_client.hget(get_attendance_key(class_id), student_id)
+
+
+async def get_attendance_summary(class_id):
+    """
+    Count present/absent students in the active session.
+
+    Args:
+        class_id (str): Class ID
+
+    Returns:
+        dict: present, absent and total counts, or None if no active session
+    """
+    async with aredis_client.pipeline() as pipe:
+        pipe.exists(get_session_key(class_id))
+        pipe.mget(*get_count_keys(class_id))
+        pipe.hlen(get_attendance_key(class_id))
+        exists, (present, absent), total = await pipe.execute()
+    if not exists:
+        return None
+    return {
+        "present": int(present or 0),
+        "absent": int(absent or 0),
+        "total": total,
+    }
+
+
+async def clear_active_session(class_id):
     """
     Clear the active session from Redis for a specific class.
 
     Args:
         class_id (str): Class ID
     """
-    key = get_session_key(class_id)
-    redis_client.delete(key)
+    await aredis_client.delete(
+        get_session_key(class_id),
+        get_attendance_key(class_id),
+        *get_count_keys(class_id),
+    )
 
 
 def session_exists(class_id):
@@ -102,7 +330,7 @@ def session_exists(class_id):
     return redis_client.exists(key) > 0
 
 
-def get_all_active_sessions():
+async def get_all_active_sessions():
     """
     Get all active sessions across all classes.
 
@@ -110,13 +338,24 @@ def get_all_active_sessions():
         dict: Dictionary mapping class_id to session data
     """
     pattern = f"{SESSION_KEY_PREFIX}*"
-    keys = redis_client.keys(pattern)
-    sessions = {}
+    # SCAN does not block the server the way KEYS does
+    class_ids = []
+    async for key in aredis_client.scan_iter(match=pattern, count=500):
+        class_id = key[len(SESSION_KEY_PREFIX):]
+        # Skip the per-session attendance hashes and counters
+        if ":" not in class_id:
+            class_ids.append(class_id)
 
-    for key in keys:
-        class_id = key.replace(SESSION_KEY_PREFIX, "")
-        data = redis_client.get(key)
-        if data:
-            sessions[class_id] = json.loads(data)
+    async with aredis_client.pipeline(transaction=False) as pipe:
+        for class_id in class_ids:
+            pipe.hgetall(get_session_key(class_id))
+            pipe.hgetall(get_attendance_key(class_id))
+        results = await pipe.execute()
+
+    sessions = {}
+    for class_id, meta, attendance in zip(class_ids, results[::2], results[1::2]):
+        if meta:
+            meta["attendance"] = attendance
+            sessions[class_id] = meta
 
     return sessions
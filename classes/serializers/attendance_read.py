@@ -13,7 +13,8 @@ class AttendanceRecordSerializer(serializers.ModelSerializer):
     class Meta:
         model = Attendance
         fields = ("id", "student", "status", "created_at")
-        read_only_fields = ("id", "created_at")
+        # Output only
+        read_only_fields = fields
 
 
 class AttendanceSessionSerializer(serializers.Serializer):
@@ -0,0 +1,138 @@
+from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+from rest_framework import serializers
+from classes.models import Attendance, ClassEnrollment
+
+# Class columns (with the teacher's) rendered by the class serializers
+CLASS_ROW_FIELDS = (
+    "id",
+    "class_name",
+    "teacher__id",
+    "teacher__username",
+    "teacher__email",
+    "teacher__role",
+    "created_at",
+    "updated_at",
+)
+
+# Renders timestamps like the serializers' DateTimeFields (current time zone)
+datetime_field = serializers.DateTimeField()
+
+
+def member_data(user_id, username, email, role):
+    """
+    UserReadSerializer representation of a user from its column values.
+    """
+    return {"id": user_id, "username": username, "email": email, "role": role}
+
+
+def class_row_data(row, students, **details):
+    """
+    Class representation from a CLASS_ROW_FIELDS values() row and its
+    students; `details` are placed before the timestamps.
+    """
+    return {
+        "id": row["id"],
+        "class_name": row["class_name"],
+        "teacher": member_data(
+            row["teacher__id"],
+            row["teacher__username"],
+            row["teacher__email"],
+            row["teacher__role"],
+        ),
+        "students": students,
+        "student_count": len(students),
+        **details,
+        "created_at": datetime_field.to_representation(row["created_at"]),
+        "updated_at": datetime_field.to_representation(row["updated_at"]),
+    }
+
+
+def serialize_class_list(classes):
+    """
+    Build the ClassReadSerializer representation of a class queryset straight
+    from values() rows, without instantiating Class or User models.
+    """
+    class_rows = classes.values(*CLASS_ROW_FIELDS)
+
+    # Enrolled students of all listed classes in one query
+    enrollments = ClassEnrollment.objects.filter(
+        class_instance__in=classes.values("id")
+    ).values_list(
+        "class_instance_id",
+        "student__id",
+        "student__username",
+        "student__email",
+        "student__role",
+    )
+    students_by_class = defaultdict(list)
+    for class_id, *student in enrollments:
+        students_by_class[class_id].append(member_data(*student))
+
+    return [
+        class_row_data(row, students_by_class.get(row["id"], []))
+        for row in class_rows
+    ]
+
+
+def serialize_class_detail(row):
+    """
+    Build the ClassDetailSerializer representation of a class from its
+    CLASS_ROW_FIELDS values() row: one query for the students and one for
+    all attendance records, with the per-session counts computed while
+    grouping the records.
+    """
+    students = [
+        member_data(*student)
+        for student in ClassEnrollment.objects.filter(
+            class_instance_id=row["id"]
+        ).values_list(
+            "student__id", "student__username", "student__email", "student__role"
+        )
+    ]
+
+    records = (
+        Attendance.objects.filter(class_instance_id=row["id"])
+        .order_by("-session_id", "-created_at")
+        .values_list(
+            "session_id",
+            "id",
+            "status",
+            "created_at",
+            "student__id",
+            "student__username",
+            "student__email",
+            "student__role",
+        )
+    )
+
+    sessions = []
+    for session_id, session_records in groupby(records, key=itemgetter(0)):
+        attendance_records = []
+        present_count = absent_count = 0
+        for _, record_id, record_status, created_at, *student in session_records:
+            if record_status == Attendance.Status.PRESENT:
+                present_count += 1
+            elif record_status == Attendance.Status.ABSENT:
+                absent_count += 1
+            attendance_records.append({
+                "id": record_id,
+                "student": member_data(*student),
+                "status": record_status,
+                "created_at": datetime_field.to_representation(created_at),
+            })
+
+        sessions.append({
+            "session_id": session_id,
+            # Records are newest first
+            "date": attendance_records[0]["created_at"],
+            "total_students": len(attendance_records),
+            "present_count": present_count,
+            "absent_count": absent_count,
+            "attendance_records": attendance_records,
+        })
+
+    return class_row_data(
+        row, students, total_sessions=len(sessions), sessions=sessions
+    )
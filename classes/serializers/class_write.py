@@ -17,6 +17,6 @@ class ClassWriteSerializer(serializers.ModelSerializer):
         if user.role != "TEACHER":
             raise serializers.ValidationError("Only teachers can create classes.")
 
-        validated_data["teacher"] = user
+        validated_data["teacher_id"] = user.id
         class_instance = Class.objects.create(**validated_data)
         return class_instance
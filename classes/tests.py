@@ -1,3 +1,73 @@
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.db import connection
 from django.test import TestCase
+from classes.consumers import AttendanceConsumer
+from classes.models import Attendance, Class
+from users.models import User
 
-# Create your tests here.
+
+class PersistAttendanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        teacher = User.objects.create_user(
+            username="teacher",
+            email="teacher@example.com",
+            password="password123",
+            role=User.Role.TEACHER,
+        )
+        cls.students = [
+            User.objects.create_user(
+                username=f"student{i}",
+                email=f"student{i}@example.com",
+                password="password123",
+                role=User.Role.STUDENT,
+            )
+            for i in range(3)
+        ]
+        cls.class_instance = Class.objects.create(class_name="Math", teacher=teacher)
+        cls.class_instance.students.add(*cls.students)
+
+    def persist(self):
+        session = {
+            "sessionId": "session-1",
+            "classId": str(self.class_instance.id),
+            "attendance": {
+                str(self.students[0].id): "present",
+                # Not enrolled: ignored
+                "999": "present",
+            },
+        }
+        return async_to_sync(AttendanceConsumer().persist_attendance)(session)
+
+    def assert_persisted_once(self):
+        self.assertEqual(self.persist(), {"present": 1, "absent": 2, "total": 3})
+        self.assertEqual(self.persist(), {"present": 1, "absent": 2, "total": 3})
+        self.assertEqual(
+            dict(
+                Attendance.objects.filter(session_id="session-1").values_list(
+                    "student_id", "status"
+                )
+            ),
+            {
+                self.students[0].id: "present",
+                self.students[1].id: "absent",
+                self.students[2].id: "absent",
+            },
+        )
+
+    def test_repeated_persist_is_ignored(self):
+        self.assert_persisted_once()
+
+    def test_repeated_persist_without_ignore_conflicts(self):
+        with mock.patch.object(
+            connection.features, "supports_ignore_conflicts", False
+        ):
+            self.assert_persisted_once()
+
+    def test_missing_class(self):
+        session = {"sessionId": "session-1", "classId": "999", "attendance": {}}
+
+        self.assertIsNone(
+            async_to_sync(AttendanceConsumer().persist_attendance)(session)
+        )
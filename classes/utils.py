@@ -0,0 +1,17 @@
+import time
+
+# (epoch second, formatted timestamp) of the last iso_now_seconds call
+_now_cache = (0, "")
+
+
+def iso_now_seconds():
+    """
+    Current UTC time as an ISO 8601 string with second resolution,
+    e.g. "2026-01-09T16:17:00Z". Formatted at most once per second and
+    shared by every caller within that second.
+    """
+    global _now_cache
+    now = int(time.time())
+    if now != _now_cache[0]:
+        _now_cache = (now, time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now)))
+    return _now_cache[1]
@@ -2,11 +2,12 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from drf_spectacular.utils import extend_schema, OpenApiResponse
-from datetime import datetime
-import uuid
-from classes.models import Class, Attendance
+from django.db.models import OuterRef, Q, Subquery, prefetch_related_objects
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
+import secrets
+from classes.models import Class, Attendance, students_prefetch
 from classes.serializers import (
     ClassWriteSerializer,
     ClassReadSerializer,
@@ -14,14 +15,47 @@ from classes.serializers import (
     AddStudentSerializer,
     StartAttendanceSerializer,
 )
+from classes.serializers.class_rows import (
+    CLASS_ROW_FIELDS,
+    serialize_class_detail,
+    serialize_class_list,
+)
 from users.models import User
-from classes.redis_utils import (
-    set_active_session,
-    get_active_session,
-    update_attendance,
-    clear_active_session,
-    session_exists,
+from classes.redis_utils import publish_class_joined, set_active_session
+from classes.utils import iso_now_seconds
+
+# Response schemas and responses shared by the endpoint docs below
+START_ATTENDANCE_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "success": {"type": "boolean"},
+        "data": {
+            "type": "object",
+            "properties": {
+                "sessionId": {"type": "string"},
+                "classId": {"type": "string"},
+                "startedAt": {"type": "string"},
+            },
+        },
+    },
+}
+ADD_STUDENT_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "success": {"type": "boolean"},
+        "data": {
+            "type": "object",
+            "properties": {
+                "classId": {"type": "string"},
+                "addedStudentId": {"type": "string"},
+            },
+        },
+    },
+}
+FORBIDDEN_NOT_CLASS_TEACHER = OpenApiResponse(
+    description="Forbidden, not class teacher"
 )
+CLASS_NOT_FOUND = OpenApiResponse(description="Class not found")
 
 
 class IsTeacher(IsAuthenticated):
@@ -69,27 +103,11 @@ class ClassViewSet(viewsets.ViewSet):
         - Students: Classes they're enrolled in
         - Admins: All classes
         """
-        user = request.user
-
-        if user.role == User.Role.TEACHER:
-            # Teachers see classes they teach
-            classes = Class.objects.filter(teacher=user).prefetch_related(
-                "students", "teacher"
-            )
-        elif user.role == User.Role.STUDENT:
-            # Students see classes they're enrolled in
-            classes = Class.objects.filter(students=user).prefetch_related(
-                "students", "teacher"
-            )
-        elif user.role == User.Role.ADMIN:
-            # Admins see all classes
-            classes = Class.objects.all().prefetch_related("students", "teacher")
-        else:
-            classes = Class.objects.none()
+        classes = Class.objects.for_user(request.user)
 
-        serializer = ClassReadSerializer(classes, many=True)
         return Response(
-            {"success": True, "data": serializer.data}, status=status.HTTP_200_OK
+            {"success": True, "data": serialize_class_list(classes)},
+            status=status.HTTP_200_OK,
         )
 
     @extend_schema(
@@ -108,8 +126,12 @@ class ClassViewSet(viewsets.ViewSet):
         )
         serializer.is_valid(raise_exception=True)
         class_instance = serializer.save()
+        # Let the teacher's other open sockets follow the new class
+        publish_class_joined(request.user.id, class_instance.id)
 
-        # Return the created class with read serializer
+        # Return the created class with read serializer; load the students
+        # once for both `students` and `student_count`
+        prefetch_related_objects([class_instance], students_prefetch())
         read_serializer = ClassReadSerializer(class_instance)
         return Response(
             {"success": True, "data": read_serializer.data},
@@ -117,9 +139,19 @@ class ClassViewSet(viewsets.ViewSet):
         )
 
     @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "verbose",
+                bool,
+                description="Return the full updated class instead of the ids only",
+            ),
+        ],
         responses={
-            200: ClassReadSerializer,
-            403: OpenApiResponse(description="Forbidden, not class teacher"),
+            200: OpenApiResponse(
+                description="Student added. With verbose=1 the data is the updated class (ClassRead).",
+                response=ADD_STUDENT_RESPONSE_SCHEMA,
+            ),
+            403: FORBIDDEN_NOT_CLASS_TEACHER,
             404: OpenApiResponse(description="Class not found or Student not found"),
         },
         description="Add a student to the class by student_id in URL. Only the teacher who owns the class can add students.",
@@ -134,11 +166,12 @@ class ClassViewSet(viewsets.ViewSet):
         """
         POST /api/class/:id/add-student/:student_id/
         Add a student to the class by student_id in URL. Only the teacher who owns the class can add students.
+        Responds with the class and student ids; ?verbose=1 returns the whole updated class.
         """
-        class_instance = get_object_or_404(Class, pk=pk)
+        class_instance = get_object_or_404(Class.objects.with_teacher(), pk=pk)
 
         # Check if the requesting teacher owns this class
-        if class_instance.teacher != request.user:
+        if class_instance.teacher_id != request.user.id:
             return Response(
                 {"success": False, "error": "Forbidden, not class teacher"},
                 status=status.HTTP_403_FORBIDDEN,
@@ -148,11 +181,29 @@ class ClassViewSet(viewsets.ViewSet):
 
         # Add student to class
         class_instance.students.add(student)
+        # Let the student's open sockets follow the class right away
+        publish_class_joined(student.id, class_instance.id)
+
+        if request.query_params.get("verbose") in ("1", "true", "True"):
+            # Return updated class; load the students once for both
+            # `students` and `student_count`
+            prefetch_related_objects([class_instance], students_prefetch())
+            read_serializer = ClassReadSerializer(class_instance)
+            return Response(
+                {"success": True, "data": read_serializer.data},
+                status=status.HTTP_200_OK,
+            )
 
-        # Return updated class
-        read_serializer = ClassReadSerializer(class_instance)
+        # Confirm the insert without re-serializing the whole class
         return Response(
-            {"success": True, "data": read_serializer.data}, status=status.HTTP_200_OK
+            {
+                "success": True,
+                "data": {
+                    "classId": str(class_instance.id),
+                    "addedStudentId": str(student.id),
+                },
+            },
+            status=status.HTTP_200_OK,
         )
 
     @extend_schema(
@@ -161,7 +212,7 @@ class ClassViewSet(viewsets.ViewSet):
             403: OpenApiResponse(
                 description="Forbidden, not class teacher or enrolled student"
             ),
-            404: OpenApiResponse(description="Class not found"),
+            404: CLASS_NOT_FOUND,
         },
         description="Get class details including all students and attendance sessions by class name. Accessible by teacher (owner) or enrolled students.",
     )
@@ -177,19 +228,31 @@ class ClassViewSet(viewsets.ViewSet):
         Get class details including all students and attendance sessions by class name.
         Accessible by teacher (owner) or enrolled students.
         """
-        class_instance = get_object_or_404(Class, class_name=class_name)
+        user = request.user
 
-        # Check access: teacher owns class OR student is enrolled
-        is_teacher = (
-            request.user.role == User.Role.TEACHER
-            and class_instance.teacher == request.user
-        )
-        is_enrolled_student = (
-            request.user.role == User.Role.STUDENT
-            and class_instance.students.filter(id=request.user.id).exists()
-        )
+        # Fetch the class only if the user may see it: teacher owns the class
+        # OR student is enrolled. Class names are not unique, so this also
+        # picks the class the user belongs to.
+        if user.role == User.Role.TEACHER:
+            access = Q(teacher_id=user.id)
+        elif user.role == User.Role.STUDENT:
+            access = Q(is_enrolled=True)
+        else:
+            access = None
+
+        row = None
+        if access is not None:
+            row = (
+                Class.objects.with_enrollment(user)
+                .filter(access, class_name=class_name)
+                .values(*CLASS_ROW_FIELDS)
+                .first()
+            )
 
-        if not (is_teacher or is_enrolled_student):
+        if row is None:
+            # Tell a missing class apart from one the user can't access
+            if not Class.objects.filter(class_name=class_name).exists():
+                raise Http404("No Class matches the given query.")
             return Response(
                 {
                     "success": False,
@@ -198,9 +261,10 @@ class ClassViewSet(viewsets.ViewSet):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        serializer = ClassDetailSerializer(class_instance)
+        # Same representation as ClassDetailSerializer, built from values()
         return Response(
-            {"success": True, "data": serializer.data}, status=status.HTTP_200_OK
+            {"success": True, "data": serialize_class_detail(row)},
+            status=status.HTTP_200_OK,
         )
 
     @extend_schema(
@@ -209,7 +273,7 @@ class ClassViewSet(viewsets.ViewSet):
                 description="Returns attendance status for the student. Status can be 'present', 'absent', or null if not yet marked."
             ),
             403: OpenApiResponse(description="Forbidden, not enrolled in class"),
-            404: OpenApiResponse(description="Class not found"),
+            404: CLASS_NOT_FOUND,
         },
         description="Get student's own attendance for a class. Student must be enrolled.",
     )
@@ -224,61 +288,50 @@ class ClassViewSet(viewsets.ViewSet):
         GET /api/class/:id/my-attendance/
         Get student's own attendance for a class. Student must be enrolled.
         """
-        class_instance = get_object_or_404(Class, pk=pk)
+        # Class existence, enrollment and the latest attendance status in
+        # a single query, without instantiating any model
+        latest_status = (
+            Attendance.objects.filter(
+                class_instance=OuterRef("pk"), student_id=request.user.id
+            )
+            .order_by("-created_at")
+            .values("status")[:1]
+        )
+        row = (
+            Class.objects.with_enrollment(request.user)
+            .filter(pk=pk)
+            .annotate(status=Subquery(latest_status))
+            .values("id", "is_enrolled", "status")
+            .first()
+        )
+        if row is None:
+            raise Http404("No Class matches the given query.")
 
         # Check if student is enrolled in this class
-        if not class_instance.students.filter(id=request.user.id).exists():
+        if not row["is_enrolled"]:
             return Response(
                 {"success": False, "error": "Forbidden, not enrolled in class"},
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        # Check if attendance record exists
-        try:
-            attendance = Attendance.objects.get(
-                class_instance=class_instance, student=request.user
-            )
-            return Response(
-                {
-                    "success": True,
-                    "data": {
-                        "classId": str(class_instance.id),
-                        "status": attendance.status,
-                    },
-                },
-                status=status.HTTP_200_OK,
-            )
-        except Attendance.DoesNotExist:
-            return Response(
-                {
-                    "success": True,
-                    "data": {"classId": str(class_instance.id), "status": None},
-                },
-                status=status.HTTP_200_OK,
-            )
+        # Status is None if no attendance record exists yet
+        return Response(
+            {
+                "success": True,
+                "data": {"classId": str(row["id"]), "status": row["status"]},
+            },
+            status=status.HTTP_200_OK,
+        )
 
     @extend_schema(
         request=StartAttendanceSerializer,
         responses={
             200: OpenApiResponse(
                 description="Attendance session started successfully",
-                response={
-                    "type": "object",
-                    "properties": {
-                        "success": {"type": "boolean"},
-                        "data": {
-                            "type": "object",
-                            "properties": {
-                                "sessionId": {"type": "string"},
-                                "classId": {"type": "string"},
-                                "startedAt": {"type": "string"},
-                            },
-                        },
-                    },
-                },
+                response=START_ATTENDANCE_RESPONSE_SCHEMA,
             ),
-            403: OpenApiResponse(description="Forbidden, not class teacher"),
-            404: OpenApiResponse(description="Class not found"),
+            403: FORBIDDEN_NOT_CLASS_TEACHER,
+            404: CLASS_NOT_FOUND,
         },
     )
     @action(
@@ -307,33 +360,31 @@ class ClassViewSet(viewsets.ViewSet):
             )
 
         # Verify teacher owns the class
-        if class_instance.teacher != request.user:
+        if class_instance.teacher_id != request.user.id:
             return Response(
                 {"success": False, "error": "Forbidden, not class teacher"},
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        # Check if session already exists for this class
-        if session_exists(str(class_id)):
-            return Response(
-                {
-                    "success": False,
-                    "error": "Active session already exists for this class",
-                },
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
         # Create session data
-        session_id = str(uuid.uuid4())
+        session_id = secrets.token_hex(16)
+        started_at = iso_now_seconds()
         session_data = {
             "sessionId": session_id,
             "classId": str(class_id),
-            "startedAt": datetime.now().isoformat(),
+            "startedAt": started_at,
             "attendance": {},
         }
 
-        # Store in Redis (class-specific)
-        set_active_session(str(class_id), session_data)
+        # Store in Redis (class-specific) unless a session already exists
+        if not set_active_session(str(class_id), session_data, nx=True):
+            return Response(
+                {
+                    "success": False,
+                    "error": "Active session already exists for this class",
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         return Response(
             {
@@ -341,7 +392,7 @@ class ClassViewSet(viewsets.ViewSet):
                 "data": {
                     "sessionId": session_id,
                     "classId": str(class_id),
-                    "startedAt": session_data["startedAt"],
+                    "startedAt": started_at,
                 },
             },
             status=status.HTTP_200_OK,
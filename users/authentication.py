@@ -0,0 +1,65 @@
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from users.models import User
+from users.tokens import USER_CLAIMS
+
+
+class ClaimsUser(TokenUser):
+    """
+    Request user backed by the token claims (id, role, username, email,
+    is_active). It is not a User instance, so it can't be saved over the
+    stored row; compare it with models through `.id`. Staff flags and
+    permissions aren't carried: the API authorizes by role only.
+    """
+
+    @cached_property
+    def id(self):
+        return User._meta.pk.to_python(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def is_active(self):
+        return self.token["is_active"]
+
+
+def get_claims_user(validated_token):
+    """
+    ClaimsUser of a validated token, or None for tokens issued without the
+    user claims (their user has to be loaded from the database).
+    Shared by the HTTP and WebSocket authentication.
+    """
+    if any(claim not in validated_token for claim in USER_CLAIMS):
+        return None
+    return ClaimsUser(validated_token)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds request.user from the token claims
+    instead of querying the users table on every request.
+    Tokens issued without these claims fall back to the database lookup.
+
+    Deactivating a user takes effect once their access token expires:
+    the token carries is_active, and refreshing re-checks it in the database.
+    """
+
+    def get_user(self, validated_token):
+        user = get_claims_user(validated_token)
+        if user is None:
+            return super().get_user(validated_token)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+
+class ClaimsJWTScheme(SimpleJWTScheme):
+    """
+    Documents ClaimsJWTAuthentication as the regular bearer JWT scheme.
+    """
+
+    target_class = "users.authentication.ClaimsJWTAuthentication"
@@ -1,7 +1,5 @@
-from django.contrib.auth import authenticate
 from rest_framework import serializers
 from users.models import User
-from rest_framework.validators import UniqueValidator
 
 
 class LoginSerializer(serializers.Serializer):
@@ -9,7 +7,11 @@ class LoginSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True, style={"input_type": "password"})
 
     def validate(self, attrs):
-        email = attrs.get("email")
+        # Deferred until the first login
+        from django.contrib.auth import authenticate
+
+        # Stored emails are normalized on signup (lowercase domain)
+        email = User.objects.normalize_email(attrs.get("email"))
         password = attrs.get("password")
 
         user = authenticate(email=email, password=password)
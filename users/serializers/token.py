@@ -0,0 +1,10 @@
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from users.tokens import UserClaimsRefreshToken
+
+
+class UserClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    /api/token/ serializer issuing tokens that carry the user's claims.
+    """
+
+    token_class = UserClaimsRefreshToken
@@ -6,3 +6,5 @@ class UserReadSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ("id", "username", "email", "role")
+        # Output only
+        read_only_fields = fields
@@ -1,12 +1,11 @@
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 from users.models import User
-from rest_framework.validators import UniqueValidator
 
 
 class UserWriteSerializer(serializers.ModelSerializer):
-    email = serializers.EmailField(
-        validators=[UniqueValidator(queryset=User.objects.all())]
-    )
+    # Uniqueness is enforced by the database constraint (see create)
+    email = serializers.EmailField()
 
     password = serializers.CharField(
         write_only=True, min_length=8, style={"input_type": "password"}
@@ -29,12 +28,19 @@ class UserWriteSerializer(serializers.ModelSerializer):
         }
 
     def create(self, validated_data):
-        password = validated_data.pop("password", None)
-        user = User(**validated_data)
-        if password:
-            user.set_password(password)
-        else:
-            # create_user usually handles password hashing, but we support creating without one
-            user.set_unusable_password()
-        user.save()
-        return user
+        # create_user hashes the password (or marks it unusable if missing)
+        # and saves once; a duplicate email surfaces as an IntegrityError
+        # instead of being checked with a SELECT beforehand. The email is
+        # normalized up front so the re-check matches the stored value.
+        validated_data["email"] = User.objects.normalize_email(
+            validated_data["email"]
+        )
+        try:
+            with transaction.atomic():
+                return User.objects.create_user(**validated_data)
+        except IntegrityError:
+            if User.objects.filter(email=validated_data["email"]).exists():
+                raise serializers.ValidationError(
+                    {"email": ["This field must be unique."]}
+                )
+            raise
@@ -1,3 +1,153 @@
+from asgiref.sync import async_to_sync
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from attendance_system.middleware.jwt_auth import JWTAuthMiddleware
+from users.authentication import ClaimsUser
+from users.models import User
+from users.tokens import UserClaimsRefreshToken
 
-# Create your tests here.
+
+class SignupLoginTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def signup(self, email, username="alice"):
+        return self.client.post(
+            "/api/auth/signup/",
+            {
+                "username": username,
+                "email": email,
+                "password": "password123",
+                "role": "STUDENT",
+            },
+            format="json",
+        )
+
+    def login(self, email):
+        return self.client.post(
+            "/api/auth/login/",
+            {"email": email, "password": "password123"},
+            format="json",
+        )
+
+    def test_login_with_signup_email_in_mixed_case(self):
+        self.assertEqual(self.signup("Alice@Example.COM").status_code, 201)
+
+        response = self.login("Alice@Example.COM")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access", response.json()["token"])
+
+    def test_signup_duplicate_email_differing_in_domain_case(self):
+        self.assertEqual(self.signup("alice@example.com").status_code, 201)
+
+        response = self.signup("alice@EXAMPLE.COM", username="alice2")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("email", response.json())
+
+
+class ClaimsAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="teacher",
+            email="teacher@example.com",
+            password="password123",
+            role=User.Role.TEACHER,
+        )
+
+    def claims_token(self, **claims):
+        token = UserClaimsRefreshToken.for_user(self.user).access_token
+        for claim, value in claims.items():
+            token[claim] = value
+        return str(token)
+
+    def legacy_token(self):
+        # Issued without the user claims
+        return str(RefreshToken.for_user(self.user).access_token)
+
+    def me(self, token):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return client.get("/api/auth/me/")
+
+    def test_http_claims_token_needs_no_query(self):
+        with self.assertNumQueries(0):
+            response = self.me(self.claims_token())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["user"],
+            {
+                "id": self.user.id,
+                "username": "teacher",
+                "email": "teacher@example.com",
+                "role": "TEACHER",
+            },
+        )
+
+    def test_http_inactive_claim_is_rejected(self):
+        response = self.me(self.claims_token(is_active=False))
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["code"], "user_inactive")
+
+    def test_http_legacy_token_falls_back_to_database(self):
+        with self.assertNumQueries(1):
+            response = self.me(self.legacy_token())
+        self.assertEqual(response.status_code, 200)
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.me(self.legacy_token()).status_code, 401)
+
+    def test_claims_user_cannot_be_saved(self):
+        user = ClaimsUser(UserClaimsRefreshToken.for_user(self.user).access_token)
+
+        self.assertEqual(user.id, self.user.id)
+        with self.assertRaises(NotImplementedError):
+            user.save()
+
+    def websocket_scope(self, token):
+        scopes = []
+
+        async def app(scope, receive, send):
+            scopes.append(scope)
+
+        middleware = JWTAuthMiddleware(app)
+        async_to_sync(middleware)(
+            {"type": "websocket", "query_string": f"token={token}".encode()},
+            None,
+            None,
+        )
+        return scopes[0]
+
+    def test_websocket_claims_token(self):
+        with self.assertNumQueries(0):
+            scope = self.websocket_scope(self.claims_token())
+
+        self.assertIsInstance(scope["user"], ClaimsUser)
+        self.assertEqual(scope["user_id"], self.user.id)
+        self.assertEqual(scope["role"], "TEACHER")
+
+    def test_websocket_inactive_claim_is_anonymous(self):
+        scope = self.websocket_scope(self.claims_token(is_active=False))
+
+        self.assertTrue(scope["user"].is_anonymous)
+        self.assertIsNone(scope["user_id"])
+
+    def test_websocket_legacy_token_falls_back_to_database(self):
+        scope = self.websocket_scope(self.legacy_token())
+        self.assertEqual(scope["user"], self.user)
+        self.assertEqual(scope["role"], "TEACHER")
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        scope = self.websocket_scope(self.legacy_token())
+        self.assertTrue(scope["user"].is_anonymous)
+
+    def test_websocket_invalid_token_is_anonymous(self):
+        scope = self.websocket_scope("garbage")
+
+        self.assertTrue(scope["user"].is_anonymous)
+        self.assertIsNone(scope["role"])
@@ -0,0 +1,19 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# User fields copied into every token, so requests can be authenticated
+# without loading the user from the database
+USER_CLAIMS = ("role", "username", "email", "is_active")
+
+
+class UserClaimsRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the user's role, username, email and is_active.
+    Access tokens derived from it inherit these claims.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
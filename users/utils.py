@@ -1,8 +1,8 @@
-from rest_framework_simplejwt.tokens import RefreshToken
+from users.tokens import UserClaimsRefreshToken
 
 
 def create_jwt_token(user):
-    refresh = RefreshToken.for_user(user)
+    refresh = UserClaimsRefreshToken.for_user(user)
     return {
         "access": str(refresh.access_token),
         "refresh": str(refresh),
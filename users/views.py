@@ -1,5 +1,3 @@
-from django.shortcuts import render
-from django.views import View
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action